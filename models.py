@@ -2,25 +2,39 @@
 Notification app models
 """
 
+import copy
 import smtplib
 import logging
 import os
-from functools import lru_cache
+import queue
+import threading
+import uuid
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache, partial
 from email.mime.image import MIMEImage
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from mimetypes import guess_type
 from email.mime.base import MIMEBase
 from email.encoders import encode_base64
+from email.header import Header
+from email import policy
 import datetime
+import itertools
+import json
+from collections import defaultdict
 
 from django.db import models
-from django.template.loader import render_to_string
+from django.template.loader import get_template, render_to_string
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.postgres.fields import JSONField
+from requests.adapters import HTTPAdapter
 import slack_sdk
 from twilio import rest as twilio_rest
+from twilio.http.http_client import TwilioHttpClient
+import celery
 
 from api.apps.notifier import utils as notification_utils
 from api import utils
@@ -28,8 +42,104 @@ from api import utils
 
 log = logging.getLogger(__name__)
 
+# Bindings Twilio Notify accepts per notification request
+TWILIO_NOTIFY_MAX_BINDINGS = 10000
 
-class SlackConnector(models.Model):
+# Subjects read per database round trip when building a cohort
+SUBJECTS_CHUNK_SIZE = 500
+
+SMTP_POOL_SIZE = 5
+SMTP_MAX_MESSAGES_PER_CLIENT = 100
+
+# Serialization of the compat32 MIME objects with the CRLF line endings SMTP
+# requires, smtplib only converts line endings of str payloads
+SMTP_POLICY = policy.compat32.clone(linesep="\r\n")
+
+# Wire format of an HTML email with the embedded logo and no attachments
+HTML_EMAIL = (
+    b'Content-Type: multipart/mixed; boundary="%(boundary)s"\r\n'
+    b"MIME-Version: 1.0\r\n"
+    b"Subject: %(subject)s\r\n"
+    b"To: %(recipient)s\r\n"
+    b"From: %(sender)s\r\n"
+    b"\r\n"
+    b"--%(boundary)s\r\n"
+    b"%(body)s\r\n"
+    b"--%(boundary)s\r\n"
+    b"%(logo)s\r\n"
+    b"--%(boundary)s--\r\n"
+)
+
+# Open SMTP connections of the current thread keyed by (host, port, user)
+_smtp_clients = threading.local()
+
+# Pools of idle SMTP connections keyed by (host, port, user)
+_smtp_pools = {}
+_smtp_pools_lock = threading.Lock()
+
+
+@lru_cache(maxsize=512)
+def compiled_template(path):
+    """
+    Parses the template at path once per process
+    """
+
+    return get_template(path)
+
+
+@lru_cache
+def notifier_task(name):
+    """
+    Resolves a notifier Celery task once, the tasks module imports these models
+    """
+
+    return utils.go(f"api.apps.notifier.tasks.{name}")
+
+
+class CohortNotificationsMixin:
+    """
+    Sends a ContextualNotificationTemplate to a cohort through a connector's
+    send_cohort_notifications
+    """
+
+    def send_contextual_template_notifications(
+        self,
+        gaia_users_models,
+        contextual_notification_template,
+        notification_schedule=None,
+        messages=None,
+        notifications=None,
+    ):
+        """
+        Sends a ContextualTemplateNotification to each cohort member
+
+        A Notification is only added once its message is sent. Notifications
+        are bulk created unless the caller collects them, also when a send
+        fails part way through the cohort
+        """
+
+        if messages is None:
+            messages = [
+                contextual_notification_template.render(gaia_user_models)
+                for gaia_user_models in gaia_users_models
+            ]
+
+        cohort_notifications = [] if notifications is None else notifications
+        try:
+            self.send_cohort_notifications(
+                gaia_users_models,
+                contextual_notification_template,
+                notification_schedule,
+                messages,
+                cohort_notifications,
+            )
+        finally:
+            if notifications is None and cohort_notifications:
+                Notification.objects.bulk_create(cohort_notifications, batch_size=500)
+                log.info(f"Sent {len(cohort_notifications)} {self} notifications")
+
+
+class SlackConnector(CohortNotificationsMixin, models.Model):
     """
     SlackConnector model
     """
@@ -42,14 +152,24 @@ class SlackConnector(models.Model):
     def __str__(self):
         return f"{self.name} Slack connector"
 
-    @property
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def build_slack_client(token):
+        """
+        Slack SDK per token, shared across the process so its HTTP connections
+        are kept alive between connector instances
+        """
+
+        return slack_sdk.WebClient(token)
+
+    @cached_property
     def slack_client(self):
         """
-        Returns an authenticated Slack SDK
+        Returns an authenticated Slack SDK, cached on the instance
         """
 
         try:
-            slack_client = slack_sdk.WebClient(self.token)
+            slack_client = self.build_slack_client(self.token)
         except Exception as e:
             raise notification_utils.SlackException(
                 f"{self} failed to set up Slack client with {e}"
@@ -64,25 +184,60 @@ class SlackConnector(models.Model):
         gaia_user=None,
         notification_schedule=None,
         channel=None,
+        notifications=None,
+        message=None,
     ):
         """
         Sends a Slack ContextualTemplateNotification
+
+        The Notification is appended unsaved to notifications when given, for
+        the caller to bulk create. A message already rendered by the caller
+        skips rendering the template
         """
 
-        message = contextual_notification_template.render_to_string()
+        if message is None:
+            message = contextual_notification_template.render({"gaia_user": gaia_user})
+
         if gaia_user:
             self.send_message_to_user(slack_client, gaia_user, message)
         elif channel:
             self.send_message_to_channel(slack_client, channel, message)
 
-        Notification = utils.go("api.apps.notifier.models.Notification")
-        notification = Notification.objects.create(
+        notification = Notification(
             contextual_notification_template=contextual_notification_template,
             notification_schedule=notification_schedule,
             gaia_user=gaia_user,
             slack_connector=self,
+            channel=Notification.SLACK,
         )
-        log.info(f"Sent {notification} with ID {notification.id}")
+        if notifications is None:
+            notification.save()
+            log.info(f"Sent {notification} with ID {notification.id}")
+        else:
+            notifications.append(notification)
+
+    def send_cohort_notifications(
+        self,
+        gaia_users_models,
+        contextual_notification_template,
+        notification_schedule,
+        messages,
+        notifications,
+    ):
+        """
+        Sends a Slack message to each cohort member
+        """
+
+        slack_client = self.slack_client
+        for gaia_user_models, message in zip(gaia_users_models, messages):
+            self.send_contextual_template_notification(
+                slack_client,
+                contextual_notification_template,
+                gaia_user=gaia_user_models["gaia_user"],
+                notification_schedule=notification_schedule,
+                notifications=notifications,
+                message=message,
+            )
 
     def send_message_to_channel(self, slack_client, channel, message):
         """
@@ -109,7 +264,7 @@ class SlackConnector(models.Model):
             )
 
 
-class TwilioConnector(models.Model):
+class TwilioConnector(CohortNotificationsMixin, models.Model):
     """
     TwilioConnector model
     """
@@ -118,20 +273,36 @@ class TwilioConnector(models.Model):
     account_sid = models.CharField(max_length=256)
     auth_token = models.CharField(max_length=256)
     sender = models.CharField(max_length=256)
+    notify_service_sid = models.CharField(max_length=256, null=True, blank=True)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} Twilio connector"
 
-    @property
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def build_twilio_client(account_sid, auth_token):
+        """
+        Twilio SDK per account, shared across the process so its HTTP
+        connections are kept alive between connector instances
+        """
+
+        http_client = TwilioHttpClient(pool_connections=True)
+        http_client.session.mount(
+            "https://", HTTPAdapter(pool_connections=10, pool_maxsize=50)
+        )
+
+        return twilio_rest.Client(account_sid, auth_token, http_client=http_client)
+
+    @cached_property
     def twilio_client(self):
         """
-        Returns an authenticated Twilio SDK
+        Returns an authenticated Twilio SDK, cached on the instance
         """
 
         try:
-            twilio_client = twilio_rest.Client(self.account_sid, self.auth_token)
+            twilio_client = self.build_twilio_client(self.account_sid, self.auth_token)
         except Exception as e:
             raise notification_utils.TwilioException(
                 f"{self} failed to set up Twilio client with {e}"
@@ -145,24 +316,106 @@ class TwilioConnector(models.Model):
         gaia_user,
         contextual_notification_template,
         notification_schedule=None,
+        notifications=None,
+        message=None,
     ):
         """
         Sends a SMS ContextualTemplateNotification
+
+        The Notification is appended unsaved to notifications when given, for
+        the caller to bulk create. A message already rendered by the caller
+        skips rendering the template
         """
 
-        self.send_sms(
-            twilio_client,
-            gaia_user.phone_number,
-            contextual_notification_template.render_to_string(),
-        )
-        Notification = utils.go("api.apps.notifier.models.Notification")
-        notification = Notification.objects.create(
+        if message is None:
+            message = contextual_notification_template.render({"gaia_user": gaia_user})
+
+        self.send_sms(twilio_client, gaia_user.phone_number, message)
+        notification = Notification(
             contextual_notification_template=contextual_notification_template,
             notification_schedule=notification_schedule,
             gaia_user=gaia_user,
             twilio_connector=self,
+            channel=Notification.SMS,
+        )
+        if notifications is None:
+            notification.save()
+            log.info(f"Sent {notification} with ID {notification.id}")
+        else:
+            notifications.append(notification)
+
+    def send_cohort_notifications(
+        self,
+        gaia_users_models,
+        contextual_notification_template,
+        notification_schedule,
+        messages,
+        notifications,
+    ):
+        """
+        Sends a SMS message to each cohort member, or through Twilio Notify
+        requests per distinct message when the connector has a Notify service
+        """
+
+        twilio_client = self.twilio_client
+        if not self.notify_service_sid:
+            for gaia_user_models, message in zip(gaia_users_models, messages):
+                self.send_contextual_template_notification(
+                    twilio_client,
+                    gaia_user_models["gaia_user"],
+                    contextual_notification_template,
+                    notification_schedule,
+                    notifications,
+                    message,
+                )
+
+            return
+
+        messages_gaia_users = defaultdict(list)
+        for gaia_user_models, message in zip(gaia_users_models, messages):
+            messages_gaia_users[message].append(gaia_user_models["gaia_user"])
+
+        for message, gaia_users in messages_gaia_users.items():
+            for start in range(0, len(gaia_users), TWILIO_NOTIFY_MAX_BINDINGS):
+                self.send_bulk_contextual_template_notification(
+                    twilio_client,
+                    gaia_users[start : start + TWILIO_NOTIFY_MAX_BINDINGS],
+                    contextual_notification_template,
+                    notification_schedule,
+                    notifications,
+                    message,
+                )
+
+    def send_bulk_contextual_template_notification(
+        self,
+        twilio_client,
+        gaia_users,
+        contextual_notification_template,
+        notification_schedule,
+        notifications,
+        message,
+    ):
+        """
+        Sends a SMS ContextualTemplateNotification to gaia_users with one
+        Twilio Notify request
+
+        The Notifications are appended unsaved to notifications once sent, for
+        the caller to bulk create
+        """
+
+        self.send_bulk(
+            twilio_client, [gaia_user.phone_number for gaia_user in gaia_users], message
+        )
+        notifications.extend(
+            Notification(
+                contextual_notification_template=contextual_notification_template,
+                notification_schedule=notification_schedule,
+                gaia_user=gaia_user,
+                twilio_connector=self,
+                channel=Notification.SMS,
+            )
+            for gaia_user in gaia_users
         )
-        log.info(f"Sent {notification} with ID {notification.id}")
 
     def send_sms(self, twilio_client, recipient, message):
         """
@@ -179,6 +432,26 @@ class TwilioConnector(models.Model):
         except Exception as e:
             raise notification_utils.TwilioException(f"{self} failed to SMS with {e}")
 
+    def send_bulk(self, twilio_client, recipients, message):
+        """
+        Sends one SMS message to at most TWILIO_NOTIFY_MAX_BINDINGS recipients
+        through the Twilio Notify service, which fans it out server side
+        """
+
+        bindings = [
+            json.dumps({"binding_type": "sms", "address": recipient})
+            for recipient in recipients
+        ]
+        try:
+            twilio_client.notify.services(self.notify_service_sid).notifications.create(
+                to_binding=bindings, body=message
+            )
+            log.debug(f"Sent SMS to {len(bindings)} recipients")
+        except Exception as e:
+            raise notification_utils.TwilioException(
+                f"{self} failed to bulk SMS with {e}"
+            )
+
 
 class SMTPConnector(models.Model):
     """
@@ -199,9 +472,9 @@ class SMTPConnector(models.Model):
 
     @staticmethod
     @lru_cache
-    def logo_img():
+    def logo_data():
         """
-        Logo image data to embed in an email body
+        Logo image bytes, read once per process
         """
 
         with open(
@@ -216,17 +489,62 @@ class SMTPConnector(models.Model):
             ),
             "rb",
         ) as fh:
-            logo_data = fh.read()
+            return fh.read()
+
+    @classmethod
+    def logo_img(cls):
+        """
+        Logo image to embed in an email body, a new MIME part for every email
+        """
 
-        logo = MIMEImage(logo_data)
+        logo = MIMEImage(cls.logo_data())
         logo.add_header("Content-ID", "<email_logo.png>")
 
         return logo
 
+    @property
+    def smtp_client_key(self):
+        """
+        Key of this connector's SMTP connection in the thread-local cache
+        """
+
+        return self.host, self.port, self.user
+
     @property
     def smtp_client(self):
         """
-        Returns an authenticated SMTP client
+        Returns an authenticated SMTP client, reusing the thread's live connection
+        """
+
+        if not hasattr(_smtp_clients, "clients"):
+            _smtp_clients.clients = {}
+
+        client = _smtp_clients.clients.get(self.smtp_client_key)
+        if client and not self.smtp_client_alive(client):
+            log.debug(f"{self} SMTP client failed NOOP, reconnecting")
+            self.close_smtp_client()
+            client = None
+
+        if not client:
+            client = self.connect_smtp_client()
+            _smtp_clients.clients[self.smtp_client_key] = client
+
+        return client
+
+    @staticmethod
+    def smtp_client_alive(client):
+        """
+        Checks an SMTP connection is still usable with a NOOP
+        """
+
+        try:
+            return client.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def connect_smtp_client(self):
+        """
+        Opens a new authenticated SMTP connection
         """
 
         try:
@@ -237,6 +555,7 @@ class SMTPConnector(models.Model):
                 client.ehlo()
 
             client.login(self.user, self.password)
+            client.messages_sent = 0
             log.debug(f"{self} set up SMTP client")
         except Exception as e:
             raise notification_utils.EmailException(
@@ -245,20 +564,90 @@ class SMTPConnector(models.Model):
 
         return client
 
+    @staticmethod
+    def quit_smtp_client(client):
+        """
+        Gracefully QUITs an SMTP connection
+        """
+
+        try:
+            client.quit()
+        except (smtplib.SMTPException, OSError):
+            client.close()
+
+    def close_smtp_client(self):
+        """
+        Gracefully QUITs the thread's cached SMTP connection
+        """
+
+        client = getattr(_smtp_clients, "clients", {}).pop(self.smtp_client_key, None)
+        if client:
+            self.quit_smtp_client(client)
+            log.debug(f"{self} closed SMTP client")
+
+    @property
+    def smtp_pool(self):
+        """
+        Returns the process-wide pool of idle SMTP connections for this connector
+        """
+
+        with _smtp_pools_lock:
+            return _smtp_pools.setdefault(
+                self.smtp_client_key, queue.Queue(maxsize=SMTP_POOL_SIZE)
+            )
+
+    @contextmanager
+    def lease_smtp_client(self):
+        """
+        Leases a live SMTP connection from the pool for sending a batch of
+        messages with send_email
+        """
+
+        pool = self.smtp_pool
+        try:
+            client = pool.get_nowait()
+        except queue.Empty:
+            client = None
+
+        if client and not self.smtp_client_alive(client):
+            log.debug(f"{self} pooled SMTP client failed NOOP, reconnecting")
+            self.quit_smtp_client(client)
+            client = None
+
+        if not client:
+            client = self.connect_smtp_client()
+
+        try:
+            yield client
+        except Exception:
+            self.quit_smtp_client(client)
+            raise
+
+        if client.messages_sent >= SMTP_MAX_MESSAGES_PER_CLIENT:
+            self.quit_smtp_client(client)
+            return
+
+        try:
+            pool.put_nowait(client)
+        except queue.Full:
+            self.quit_smtp_client(client)
+
     def send_contextual_template_notification(
         self,
         gaia_users_models,
         contextual_notification_template,
         notification_schedule=None,
+        message=None,
     ):
         """
         Sends an contextual email notification
         """
 
-        message = contextual_notification_template.render(gaia_users_models)
+        if message is None:
+            message = contextual_notification_template.render(gaia_users_models)
+
         gaia_user = gaia_users_models["gaia_user"]
-        send_email_contextual_template_notification_task = utils.go("api.apps.notifier.tasks.send_email_contextual_template_notification_task")
-        send_email_contextual_template_notification_task(
+        notifier_task("send_email_contextual_template_notification_task")(
             self.id,
             gaia_user.id,
             contextual_notification_template.id,
@@ -268,6 +657,125 @@ class SMTPConnector(models.Model):
             message=message
         )
 
+    def send_contextual_template_notifications(
+        self,
+        gaia_users_models,
+        contextual_notification_template,
+        notification_schedule=None,
+        messages=None,
+    ):
+        """
+        Sends a contextual email notification to each cohort member as a group
+        of Celery tasks, called like the single send
+        """
+
+        if messages is None:
+            messages = [
+                contextual_notification_template.render(gaia_user_models)
+                for gaia_user_models in gaia_users_models
+            ]
+
+        notification_schedule_id = (
+            notification_schedule.id if notification_schedule else None
+        )
+        email_subject = contextual_notification_template.context["email_subject"]
+        send_email_contextual_template_notification_task = notifier_task("send_email_contextual_template_notification_task")
+        celery.group(
+            send_email_contextual_template_notification_task.s(
+                self.id,
+                gaia_user_models["gaia_user"].id,
+                contextual_notification_template.id,
+                notification_schedule_id,
+                email_subject,
+                html=contextual_notification_template.html,
+                message=message,
+            )
+            for gaia_user_models, message in zip(gaia_users_models, messages)
+        ).apply_async()
+
+    @classmethod
+    @lru_cache
+    def logo_part(cls):
+        """
+        Serialized logo MIME part, base64 encoded once per process
+        """
+
+        return cls.logo_img().as_bytes(policy=SMTP_POLICY)
+
+    def html_email(self, recipient, subject, message):
+        """
+        Serialized HTML email with the embedded logo, assembled from the cached
+        logo part without building a MIME tree
+        """
+
+        return HTML_EMAIL % {
+            b"boundary": f"==============={uuid.uuid4().hex}==".encode(),
+            b"subject": Header(subject).encode(linesep="\r\n").encode(),
+            b"recipient": recipient.encode(),
+            b"sender": self.user.encode(),
+            b"body": MIMEText(
+                message.encode("utf-8"), "html", _charset="utf-8"
+            ).as_bytes(policy=SMTP_POLICY),
+            b"logo": self.logo_part(),
+        }
+
+    @classmethod
+    @lru_cache(maxsize=128)
+    def email_skeleton(cls, sender, subject, html=True):
+        """
+        Email without recipient, body and attachments, built once per sender
+        and subject and copied for each recipient
+        """
+
+        email = MIMEMultipart()
+        email["Subject"] = "{}\n".format(subject)
+        email["From"] = sender
+
+        if html:
+            email.attach(cls.logo_img())
+            email.content_subtype = "html"
+            email.mixed_subtype = "related"
+
+        return email
+
+    @staticmethod
+    def personalize_email(
+        email_skeleton, recipient, message, html=True, attachments=()
+    ):
+        """
+        Copies an email skeleton addressed to recipient with message as its body
+
+        Attachments are read on every send, so a file rewritten at the same
+        path is never sent stale
+        """
+
+        email = copy.deepcopy(email_skeleton)
+        email["To"] = recipient
+        email.get_payload().insert(
+            0,
+            MIMEText(
+                message.encode("utf-8"), "html" if html else "plain", _charset="utf-8"
+            ),
+        )
+
+        for attachement in attachments:
+            mimetype, encoding = guess_type(attachement)
+            mimetype = mimetype.split("/", 1)
+            with open(attachement, "rb") as fh:
+                attachment = MIMEBase(mimetype[0], mimetype[1])
+                attachment.set_payload(fh.read())
+
+            encode_base64(attachment)
+            attachment.add_header(
+                "Content-Disposition",
+                "attachment",
+                filename=attachement.split("/")[-1],
+            )
+            email.attach(attachment)
+            log.debug(f"Added email attachment {attachment}")
+
+        return email
+
     def send_email(
         self,
         smtp_client,
@@ -280,52 +788,37 @@ class SMTPConnector(models.Model):
         attachments=None,
     ):
         """
-        Sends an email
+        Sends an email, leasing a pooled SMTP connection if no client is given
         """
 
-        email = MIMEMultipart()
-        email["Subject"] = "{}\n".format(subject)
-        email["To"] = recipient
-        email["From"] = self.user
-
         if not context:
             context = {}
 
         if not message:
             message = render_to_string(template, context)
 
-        if html:
-            email.attach(MIMEText(message.encode("utf-8"), "html", _charset="utf-8"))
-            email.attach(self.logo_img())
-            email.content_subtype = "html"
-            email.mixed_subtype = "related"
+        if html and not attachments:
+            payload = self.html_email(recipient, subject, message)
         else:
-            email.attach(MIMEText(message.encode("utf-8"), "plain", _charset="utf-8"))
-
-        if attachments:
-            for attachement in attachments:
-                mimetype, encoding = guess_type(attachement)
-                mimetype = mimetype.split("/", 1)
-                with open(attachement, "rb") as fh:
-                    attachment = MIMEBase(mimetype[0], mimetype[1])
-                    attachment.set_payload(fh.read())
-
-                encode_base64(attachment)
-                attachment.add_header(
-                    "Content-Disposition",
-                    "attachment",
-                    filename=attachement.split("/")[-1],
-                )
-                email.attach(attachment)
-                log.debug(f"{self} added email attachment {attachment}")
-
-        try:
-            smtp_client.sendmail(self.user, recipient, email.as_string())
-            log.info(f"Sent email with subject {subject} to {recipient}")
-        except Exception as e:
-            raise notification_utils.EmailException(
-                f"{self} failed to send email with {e}"
+            email = self.personalize_email(
+                self.email_skeleton(self.user, subject, html=html),
+                recipient,
+                message,
+                html=html,
+                attachments=attachments or (),
             )
+            payload = email.as_bytes(policy=SMTP_POLICY)
+
+        lease = nullcontext(smtp_client) if smtp_client else self.lease_smtp_client()
+        with lease as client:
+            try:
+                client.sendmail(self.user, recipient, payload)
+                client.messages_sent = getattr(client, "messages_sent", 0) + 1
+                log.info(f"Sent email with subject {subject} to {recipient}")
+            except Exception as e:
+                raise notification_utils.EmailException(
+                    f"{self} failed to send email with {e}"
+                )
 
 
 class NotificationSchedule(models.Model):
@@ -347,8 +840,34 @@ class NotificationSchedule(models.Model):
         ("After end date on subject group", "After end date on subject group"),
     )
     trigger_type_choices = (("subject group", "subject group"), ("job", "job"))
+    job_start_triggers = {
+        "Before job start": lambda job, instant: instant < job.start_time,
+        "After job end": lambda job, instant: instant > job.end_time,
+        "After job saved": lambda job, instant: True,
+        # TODO
+        "After job location changed": lambda job, instant: True,
+    }
+    job_end_triggers = {
+        "Until job start": lambda job, instant: instant > job.start_time,
+    }
+    subject_group_start_triggers = {
+        "After photos available": (
+            lambda subject_group, instant: subject_group.photos_available
+        ),
+        "After start date on subject group": (
+            lambda subject_group, instant: instant > subject_group.start_time
+        ),
+        "After end date on subject group": (
+            lambda subject_group, instant: instant > subject_group.end_time
+        ),
+    }
+    subject_group_end_triggers = {
+        "End date on subject group": (
+            lambda subject_group, instant: instant > subject_group.end_time
+        ),
+    }
     name = models.CharField(max_length=256, unique=True)
-    active = models.BooleanField(default=True)
+    active = models.BooleanField(default=True, db_index=True)
     all_clients = models.BooleanField(default=True)
     all_subject_groups = models.BooleanField(default=True)
     recurring = models.BooleanField(default=False, null=True, blank=True)
@@ -366,16 +885,18 @@ class NotificationSchedule(models.Model):
     recurrence_delta_count = models.IntegerField(
         default=1, validators=[MaxValueValidator(1000), MinValueValidator(1)]
     )
-    trigger_type = models.CharField(choices=trigger_type_choices, max_length=20)
+    trigger_type = models.CharField(
+        choices=trigger_type_choices, max_length=20, db_index=True
+    )
     start_at = models.DateTimeField(null=True, blank=True)
     start_trigger = models.CharField(
-        null=True, max_length=200, choices=start_trigger_choices
+        null=True, max_length=200, choices=start_trigger_choices, db_index=True
     )
     end_at = models.DateTimeField(null=True, blank=True)
     end_trigger = models.CharField(
-        null=True, max_length=200, choices=end_trigger_choices
+        null=True, max_length=200, choices=end_trigger_choices, db_index=True
     )
-    last_sent_at = models.DateTimeField(null=True, blank=True)
+    last_sent_at = models.DateTimeField(null=True, blank=True, db_index=True)
     clients = models.ManyToManyField(
         "client.Client",
         related_name="notification_schedules",
@@ -428,69 +949,106 @@ class NotificationSchedule(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["active", "trigger_type"])]
+
     def __str__(self):
         return f"{self.name} notification schedule"
 
     def run_notification_schedule(self, job=None, subject_group=None):
+        if not self.active:
+            return
+
         gaia_users_models = None
+        update_fields = set()
+        instant = utils.get_local_now()
         if job:
-            within_notification_window = self.job_within_notification_window(job)
-            if within_notification_window:
+            within_notification_window = self.job_within_notification_window(
+                job, update_fields, instant
+            )
+            if within_notification_window and self.notifies_gaia_users:
+                models.prefetch_related_objects([job], *self.job_prefetches(job))
                 gaia_users_models = self.job_gaia_users_models(job)
 
         if subject_group:
-            within_notification_window = self.subject_group_within_notification_window(subject_group)
-            if within_notification_window:
-                gaia_users_models = self.job_gaia_users_models(subject_group)
+            within_notification_window = self.subject_group_within_notification_window(
+                subject_group, update_fields, instant
+            )
+            if within_notification_window and self.notifies_gaia_users:
+                models.prefetch_related_objects(
+                    [subject_group], *self.subject_group_prefetches(subject_group)
+                )
+                gaia_users_models = self.gaia_users_models_for_subject_group(
+                    subject_group
+                )
+
+        try:
+            if gaia_users_models:
+                self.send_notifications(gaia_users_models, update_fields=update_fields)
+        finally:
+            if update_fields:
+                self.save(update_fields=sorted(update_fields))
+
+    @property
+    def notifies_gaia_users(self):
+        """
+        Whether any cohort of GaiaUsers is selected, cohorts are only built
+        when one is
+        """
+
+        return any(
+            (
+                self.employees,
+                self.clients_persons,
+                self.clients_schools,
+                self.clients_commercial_others,
+                self.subjects_booked,
+                self.subjects_parents_booked,
+                self.subjects_not_booked,
+                self.subjects_parents_not_booked,
+            )
+        )
+
+    @property
+    def recurrence_timedelta(self):
+        """
+        Time between recurring notifications
+        """
 
-        if gaia_users_models:
-            self.send_notifications(gaia_users_models)
+        return datetime.timedelta(
+            **{self.recurrence_delta: self.recurrence_delta_count}
+        )
 
-    def within_recurring_notification_window(self):
+    def within_recurring_notification_window(self, instant=None):
         """
         Determines if a recurring notification is within time range to resend
         """
 
         within_notification_window = True
-        instant = utils.get_local_now()
-        if self.recurrence_delta == "seconds":
-            delta = datetime.timedelta(seconds=self.recurrence_delta_count)
-        elif self.recurrence_delta == "minutes":
-            delta = datetime.timedelta(minutes=self.recurrence_delta_count)
-        elif self.recurrence_delta == "hours":
-            delta = datetime.timedelta(hours=self.recurrence_delta_count)
-        elif self.recurrence_delta == "days":
-            delta = datetime.timedelta(days=self.recurrence_delta_count)
-        elif self.recurrence_delta == "weeks":
-            delta = datetime.timedelta(weeks=self.recurrence_delta_count)
-
-        if self.last_sent_at and (instant - self.last_sent_at) < delta:
+        instant = instant or utils.get_local_now()
+        if (
+            self.last_sent_at
+            and (instant - self.last_sent_at) < self.recurrence_timedelta
+        ):
             within_notification_window = False
 
         return within_notification_window
 
-    def subject_group_within_notification_window(self, subject_group):
+    def subject_group_within_notification_window(
+        self, subject_group, update_fields=None, instant=None
+    ):
         """
         Determines if a schedule is within start and end triggers for notifications
+
+        Deactivation is added to update_fields when given instead of saved
         """
 
-        instant = utils.get_local_now()
-        after_start_trigger = False
-        if (
-            self.start_trigger == "After photos available"
-            and subject_group.photos_available
-        ):
-            after_start_trigger = True
-        elif (
-            self.start_trigger == "After start date on subject group"
-            and instant > subject_group.start_time
-        ):
-            after_start_trigger = True
-        elif (
-            self.start_trigger == "After end date on subject group"
-            and instant > subject_group.end_time
-        ):
-            after_start_trigger = True
+        instant = instant or utils.get_local_now()
+        start_trigger = self.subject_group_start_triggers.get(self.start_trigger)
+        end_trigger = self.subject_group_end_triggers.get(self.end_trigger)
+        after_start_trigger = bool(
+            start_trigger and start_trigger(subject_group, instant)
+        )
 
         after_end_trigger = False
         within_notification_window = False
@@ -498,58 +1056,59 @@ class NotificationSchedule(models.Model):
             after_end_trigger = True
         elif (
             after_start_trigger
-            and self.end_trigger == "End date on subject group"
-            and instant > subject_group.end_time
+            and end_trigger
+            and end_trigger(subject_group, instant)
         ):
             after_end_trigger = True
         elif after_start_trigger:
             within_notification_window = True
 
         if within_notification_window and self.recurring:
-            within_notification_window = self.within_recurring_notification_window()
+            within_notification_window = self.within_recurring_notification_window(
+                instant
+            )
 
         if after_end_trigger or (not self.recurring and within_notification_window and self.last_sent_at):
             self.active = False
-            self.save(update_fields=["active"])
+            if update_fields is None:
+                self.save(update_fields=["active"])
+            else:
+                update_fields.add("active")
 
         return within_notification_window
 
-    def job_within_notification_window(self, job):
+    def job_within_notification_window(self, job, update_fields=None, instant=None):
         """
         Determines if a schedule is within start and end triggers for notifications
+
+        Deactivation is added to update_fields when given instead of saved
         """
 
-        instant = utils.get_local_now()
-        after_start_trigger = False
-        if self.start_trigger == "Before job start" and instant < job.start_time:
-            after_start_trigger = True
-        elif job and self.start_trigger == "After job end" and instant > job.end_time:
-            after_start_trigger = True
-        elif job and self.start_trigger == "After job saved":
-            after_start_trigger = True
-        elif self.start_trigger == "After job location changed":
-            # TODO
-            after_start_trigger = True
+        instant = instant or utils.get_local_now()
+        start_trigger = self.job_start_triggers.get(self.start_trigger)
+        end_trigger = self.job_end_triggers.get(self.end_trigger)
+        after_start_trigger = bool(start_trigger and start_trigger(job, instant))
 
         after_end_trigger = False
         within_notification_window = False
         if after_start_trigger and self.end_at and instant > self.end_at:
             after_end_trigger = True
-        elif (
-            after_start_trigger
-            and self.end_trigger == "Until job start"
-            and instant > job.start_time
-        ):
+        elif after_start_trigger and end_trigger and end_trigger(job, instant):
             after_end_trigger = True
         elif after_start_trigger:
             within_notification_window = True
 
         if after_end_trigger and self.recurring:
-            within_notification_window = self.within_recurring_notification_window()
+            within_notification_window = self.within_recurring_notification_window(
+                instant
+            )
 
         if after_end_trigger or (not self.recurring and within_notification_window):
             self.active = False
-            self.save(update_fields=["active"])
+            if update_fields is None:
+                self.save(update_fields=["active"])
+            else:
+                update_fields.add("active")
 
         return within_notification_window
 
@@ -565,9 +1124,18 @@ class NotificationSchedule(models.Model):
         subject=None
     ):
         """
-        Helper to build a list of unique GaiaUser models
+        Helper to build unique GaiaUser models, keyed by their primary keys
         """
 
+        key = tuple(
+            model.pk if model else None
+            for model in (
+                gaia_user, subject_group, job, session, employee, client, subject
+            )
+        )
+        if key in gaia_users_models:
+            return gaia_users_models
+
         gaia_user_models = {
             "gaia_user": gaia_user,
         }
@@ -587,10 +1155,168 @@ class NotificationSchedule(models.Model):
             gaia_user_models["client"] = client
 
         if subject:
-            gaia_users_models["subject"] = subject
+            gaia_user_models["subject"] = subject
+
+        gaia_users_models[key] = gaia_user_models
+
+        return gaia_users_models
+
+    @staticmethod
+    def select_related_prefetch(model, lookup, *fields):
+        """
+        Prefetch of lookup from model that joins fields of the related rows
+        """
+
+        related_model = model
+        for name in lookup.split("__"):
+            related_model = related_model._meta.get_field(name).related_model
+
+        return models.Prefetch(
+            lookup, queryset=related_model.objects.select_related(*fields)
+        )
+
+    def job_prefetches(self, job):
+        """
+        Prefetches of the relations walked by job_gaia_users_models
+        """
+
+        Job = type(job)
+        return [
+            self.select_related_prefetch(Job, "employees", "gaia_user"),
+            self.select_related_prefetch(Job, "clients", "gaia_user"),
+            "clients__contacts",
+            "subject_groups",
+            "sessions",
+        ]
+
+    def subject_group_prefetches(self, subject_group):
+        """
+        Prefetches of the relations walked by gaia_users_models_for_subject_group
+        """
+
+        SubjectGroup = type(subject_group)
+        return [
+            "client__gaia_user",
+            self.select_related_prefetch(SubjectGroup, "jobs__employees", "gaia_user"),
+            self.select_related_prefetch(SubjectGroup, "jobs__clients", "gaia_user"),
+            "jobs__clients__contacts",
+            "jobs__sessions",
+        ]
+
+    @staticmethod
+    def subjects_sessions(job):
+        """
+        Maps Subject IDs to their Session on a Job from the prefetched sessions
+        """
+
+        return {session.subject_id: session for session in job.sessions.all()}
+
+    @staticmethod
+    def subjects_parents(subjects):
+        """
+        Maps Subject IDs to their parent GaiaUsers, loaded with one query on the
+        parents through table
+        """
+
+        subjects_parents = defaultdict(list)
+        if not subjects:
+            return subjects_parents
+
+        SubjectParent = subjects[0].parents.through
+        for subject_parent in SubjectParent.objects.filter(
+            subject__in=subjects
+        ).select_related("gaiauser"):
+            subjects_parents[subject_parent.subject_id].append(subject_parent.gaiauser)
+
+        return subjects_parents
 
-        if gaia_user_models not in gaia_users_models:
-            gaia_users_models.append(gaia_user_models)
+    def stream_subjects(self, subject_group):
+        """
+        Streams a SubjectGroup's subjects with their parent GaiaUsers, loading
+        parents for each chunk of SUBJECTS_CHUNK_SIZE subjects
+
+        Parents are only loaded when the schedule notifies them
+        """
+
+        notifies_parents = (
+            self.subjects_parents_booked or self.subjects_parents_not_booked
+        )
+        subjects = subject_group.subjects.select_related("gaia_user").iterator(
+            chunk_size=SUBJECTS_CHUNK_SIZE
+        )
+        while subjects_chunk := list(itertools.islice(subjects, SUBJECTS_CHUNK_SIZE)):
+            if notifies_parents:
+                subjects_parents = self.subjects_parents(subjects_chunk)
+            else:
+                subjects_parents = defaultdict(list)
+
+            for subject in subjects_chunk:
+                yield subject, subjects_parents[subject.pk]
+
+    def job_subjects_rows(self, job):
+        """
+        Flat (job, subject group, subject, session, parents) rows of a Job's
+        subjects
+        """
+
+        subjects_sessions = self.subjects_sessions(job)
+        for subject_group in job.subject_groups.all():
+            for subject, parents in self.stream_subjects(subject_group):
+                session = subjects_sessions.get(subject.pk)
+                yield job, subject_group, subject, session, parents
+
+    def subject_group_subjects_rows(self, subject_group):
+        """
+        Flat (job, subject group, subject, session, parents) rows of a
+        SubjectGroup's subjects, once per Job of the group
+        """
+
+        jobs_subjects_sessions = [
+            (job, self.subjects_sessions(job)) for job in subject_group.jobs.all()
+        ]
+        for subject, parents in self.stream_subjects(subject_group):
+            if not jobs_subjects_sessions:
+                yield None, subject_group, subject, None, parents
+
+            for job, subjects_sessions in jobs_subjects_sessions:
+                session = subjects_sessions.get(subject.pk)
+                yield job, subject_group, subject, session, parents
+
+    def subjects_gaia_users_models(self, gaia_users_models, subjects_rows):
+        """
+        Adds the booked and not booked subjects and parents of flat subjects rows
+        """
+
+        notifies_subjects = {
+            True: self.subjects_booked,
+            False: self.subjects_not_booked,
+        }
+        notifies_parents = {
+            True: self.subjects_parents_booked,
+            False: self.subjects_parents_not_booked,
+        }
+        for job, subject_group, subject, session, parents in subjects_rows:
+            booked = bool(session)
+            if notifies_subjects[booked]:
+                gaia_users_models = self.unique_gaia_users_models(
+                    gaia_users_models,
+                    subject.gaia_user,
+                    session=session,
+                    job=job,
+                    subject_group=subject_group,
+                    subject=subject,
+                )
+
+            if notifies_parents[booked]:
+                for gaia_user in parents:
+                    gaia_users_models = self.unique_gaia_users_models(
+                        gaia_users_models,
+                        gaia_user,
+                        session=session,
+                        job=job,
+                        subject_group=subject_group,
+                        subject=subject,
+                    )
 
         return gaia_users_models
 
@@ -599,7 +1325,7 @@ class NotificationSchedule(models.Model):
         Returns GaiaUser models for a Job trigger notification
         """
 
-        gaia_users_models = []
+        gaia_users_models = {}
         if self.employees:
             for employee in job.employees.all():
                 gaia_users_models = self.unique_gaia_users_models(
@@ -617,7 +1343,9 @@ class NotificationSchedule(models.Model):
             for client in job.clients.all():
                 if self.clients_persons and client.category == "Person":
                     gaia_users_models = self.unique_gaia_users_models(
-                        gaia_users_models, client.gaia_user, job=job
+                        gaia_users_models,
+                        client.gaia_user,
+                        job=job,
                     )
                 if (self.clients_schools and client.category == "School") or (
                     self.clients_commercial_others
@@ -625,7 +1353,10 @@ class NotificationSchedule(models.Model):
                 ):
                     for gaia_user in client.contacts.all():
                         gaia_users_models = self.unique_gaia_users_models(
-                            gaia_users_models, gaia_user, job=job, client=client
+                            gaia_users_models,
+                            gaia_user,
+                            job=job,
+                            client=client,
                         )
 
         if (
@@ -634,71 +1365,18 @@ class NotificationSchedule(models.Model):
             or self.subjects_not_booked
             or self.subjects_parents_not_booked
         ):
-            for subject_group in job.subject_groups.all():
-                for subject in subject_group.subjects.all():
-                    subjects_session = job.subjects_session(subject)
-                    if subjects_session and (
-                        self.subjects_booked or self.subjects_parents_booked
-                    ):
-                        if self.subjects_booked:
-                            gaia_users_models = (
-                                self.unique_gaia_users_models(
-                                    gaia_users_models,
-                                    subject.gaia_user,
-                                    session=subjects_session,
-                                    subject=subject,
-                                    job=job,
-                                    subject_group=subject_group,
-                                )
-                            )
-                        if self.subjects_parents_booked:
-                            for gaia_user in subject.parents.all():
-                                gaia_users_models = (
-                                    self.unique_gaia_users_models(
-                                        gaia_users_models,
-                                        gaia_user,
-                                        subject=subject,
-                                        session=subjects_session,
-                                        job=job,
-                                        subject_group=subject_group,
-                                    )
-                                )
-
-                    if not subjects_session and (
-                        self.subjects_not_booked or self.subjects_parents_not_booked
-                    ):
-                        if self.subjects_not_booked:
-                            gaia_users_models = (
-                                self.unique_gaia_users_models(
-                                    gaia_users_models,
-                                    subject.gaia_user,
-                                    subject=subject,
-                                    session=subjects_session,
-                                    job=job,
-                                    subject_group=subject_group,
-                                )
-                            )
-                        if self.subjects_parents_not_booked:
-                            for gaia_user in subject.parents.all():
-                                gaia_users_models = (
-                                    self.unique_gaia_users_models(
-                                        gaia_users_models,
-                                        gaia_user,
-                                        subject=subject,
-                                        session=subjects_session,
-                                        job=job,
-                                        subject_group=subject_group,
-                                    )
-                                )
+            gaia_users_models = self.subjects_gaia_users_models(
+                gaia_users_models, self.job_subjects_rows(job)
+            )
 
-        return gaia_users_models
+        return list(gaia_users_models.values())
 
     def gaia_users_models_for_subject_group(self, subject_group):
         """
         Returns GaiaUsers for a SubjectGroup trigger notification
         """
 
-        gaia_users_models = []
+        gaia_users_models = {}
         for job in subject_group.jobs.all():
             if self.employees:
                 for employee in job.employees.all():
@@ -765,147 +1443,207 @@ class NotificationSchedule(models.Model):
             or self.subjects_not_booked
             or self.subjects_parents_not_booked
         ):
-            for subject in subject_group.subjects.all():
-                if not subject_group.jobs.exists():
-                    subjects_session = None
-                    if self.subjects_not_booked:
-                        gaia_users_models = self.unique_gaia_users_models(
-                            gaia_users_models,
-                            subject.gaia_user,
-                            session=subjects_session,
-                            subject_group=subject_group,
-                        )
-                    if self.subjects_parents_not_booked:
-                        for gaia_user in subject.parents.all():
-                            gaia_users_models = (
-                                self.unique_gaia_users_models(
-                                    gaia_users_models,
-                                    gaia_user,
-                                    session=subjects_session,
-                                    subject_group=subject_group,
-                                )
-                            )
-                else:
-                    for job in subject_group.jobs.all():
-                        subjects_session = job.subjects_session(subject)
-                        if subjects_session and (
-                            self.subjects_booked or self.subjects_parents_booked
-                        ):
-                            if self.subjects_booked:
-                                gaia_users_models = (
-                                    self.unique_gaia_users_models(
-                                        gaia_users_models,
-                                        subject.gaia_user,
-                                        session=subjects_session,
-                                        job=job,
-                                        subject_group=subject_group,
-                                        subject=subject
-                                    )
-                                )
-                            if self.subjects_parents_booked:
-                                for gaia_user in subject.parents.all():
-                                    gaia_users_models = (
-                                        self.unique_gaia_users_models(
-                                            gaia_users_models,
-                                            gaia_user,
-                                            session=subjects_session,
-                                            job=job,
-                                            subject_group=subject_group,
-                                            subject=subject
-                                        )
-                                    )
-
-                        if not subjects_session and (
-                            self.subjects_not_booked or self.subjects_parents_not_booked
-                        ):
-                            if self.subjects_not_booked:
-                                gaia_users_models = (
-                                    self.unique_gaia_users_models(
-                                        gaia_users_models,
-                                        subject.gaia_user,
-                                        job=job,
-                                        subject_group=subject_group,
-                                        subject=subject
-                                    )
-                                )
-                            if self.subjects_parents_not_booked:
-                                for gaia_user in subject.parents.all():
-                                    gaia_users_models = (
-                                        self.unique_gaia_users_models(
-                                            gaia_users_models,
-                                            gaia_user,
-                                            job=job,
-                                            subject_group=subject_group,
-                                            subject=subject
-                                        )
-                                    )
+            gaia_users_models = self.subjects_gaia_users_models(
+                gaia_users_models, self.subject_group_subjects_rows(subject_group)
+            )
 
-        return gaia_users_models
+        return list(gaia_users_models.values())
+
+    def render_messages(self, gaia_users_models):
+        """
+        Renders the template for each cohort member, once for the whole cohort
+        when its context does not reference the members' models
+        """
+
+        template = self.contextual_notification_template
+        if template.recipient_specific:
+            return [
+                template.render(gaia_user_models)
+                for gaia_user_models in gaia_users_models
+            ]
+
+        return [template.render()] * len(gaia_users_models)
 
-    def send_notifications(self, gaia_users_models):
+    def send_notifications(
+        self, gaia_users_models, notifications=None, update_fields=None
+    ):
         """
-        Sends the cohort notifications
+        Sends the cohort notifications, each channel in its own thread
+
+        Email cohorts are enqueued as Celery tasks, SMS and Slack messages are
+        sent before this returns as their tasks do not exist yet
+
+        Notifications and schedule fields are written from the calling thread
+        once every channel has finished, unless the caller collects them.
+        Notifications sent before a channel fails are still written, every
+        failed channel is logged and the first failure is raised
         """
 
+        if not gaia_users_models:
+            return
+
+        save_notifications = notifications is None
+        save_update_fields = update_fields is None
+        notifications = [] if save_notifications else notifications
+        update_fields = set() if save_update_fields else update_fields
+        messages = self.render_messages(gaia_users_models)
+        channel_sends = []
         if self.smtp_connector:
-            self.send_email_notifications(gaia_users_models)
+            channel_sends.append(
+                partial(
+                    self.send_email_notifications,
+                    gaia_users_models,
+                    messages,
+                    update_fields,
+                )
+            )
 
         if self.twilio_connector:
-            self.send_sms_notifications(gaia_users_models)
+            channel_sends.append(
+                partial(
+                    self.send_sms_notifications,
+                    gaia_users_models,
+                    messages,
+                    notifications,
+                    update_fields,
+                )
+            )
 
         if self.slack_connector:
-            self.send_slack_notifications(gaia_users_models)
+            channel_sends.append(
+                partial(
+                    self.send_slack_notifications,
+                    gaia_users_models,
+                    messages,
+                    notifications,
+                    update_fields,
+                )
+            )
+
+        if not channel_sends:
+            return
 
-    def send_slack_notifications(self, gaia_users_models):
+        try:
+            with ThreadPoolExecutor(max_workers=len(channel_sends)) as executor:
+                futures = [
+                    executor.submit(channel_send) for channel_send in channel_sends
+                ]
+
+            exceptions = [
+                future.exception() for future in futures if future.exception()
+            ]
+            for exception in exceptions:
+                log.error(
+                    f"{self} failed to send notifications with {exception}",
+                    exc_info=exception,
+                )
+
+            if exceptions:
+                raise exceptions[0]
+        finally:
+            if save_notifications and notifications:
+                Notification.objects.bulk_create(notifications, batch_size=500)
+                log.info(f"Sent {len(notifications)} notifications for {self}")
+
+            if save_update_fields and update_fields:
+                self.save(update_fields=sorted(update_fields))
+
+    def send_slack_notifications(
+        self, gaia_users_models, messages=None, notifications=None, update_fields=None
+    ):
         """
         Sends a Slack notification to the cohort
         """
 
-        pass
+        slack_users_models = []
+        if self.slack_users:
+            if messages is None:
+                messages = self.render_messages(gaia_users_models)
+
+            slack_users_models = [
+                (gaia_user_models, message)
+                for gaia_user_models, message in zip(gaia_users_models, messages)
+                if gaia_user_models["gaia_user"].slack_user
+            ]
+
+        if slack_users_models:
+            self.slack_connector.send_contextual_template_notifications(
+                [gaia_user_models for gaia_user_models, _ in slack_users_models],
+                self.contextual_notification_template,
+                self,
+                [message for _, message in slack_users_models],
+                notifications,
+            )
+
+        if self.slack_channel:
+            self.slack_connector.send_contextual_template_notification(
+                self.slack_connector.slack_client,
+                self.contextual_notification_template,
+                notification_schedule=self,
+                channel=self.slack_channel,
+                notifications=notifications,
+            )
 
-    def send_sms_notifications(self, gaia_users_models):
+        if slack_users_models or self.slack_channel:
+            self.set_last_sent_at(update_fields)
+
+    def send_sms_notifications(
+        self, gaia_users_models, messages=None, notifications=None, update_fields=None
+    ):
         """
         Sends a SMS notification to the cohort
         """
 
-        sent = False
-        for gaia_user_models in gaia_users_models:
-            self.twilio_connector.send_contextual_template_notification(
-                gaia_user_models,
-                self.contextual_notification_template,
-                self
-            )
-            if not sent:
-                sent = True
+        if not gaia_users_models:
+            return
 
-        if sent:
-            self.set_last_sent_at()
+        if messages is None:
+            messages = self.render_messages(gaia_users_models)
 
-    def send_email_notifications(self, gaia_users_models):
+        self.twilio_connector.send_contextual_template_notifications(
+            gaia_users_models,
+            self.contextual_notification_template,
+            self,
+            messages,
+            notifications,
+        )
+        self.set_last_sent_at(update_fields)
+
+    def send_email_notifications(
+        self, gaia_users_models, messages=None, update_fields=None
+    ):
         """
         Sends an email notification to the cohort
         """
 
-        sent = False
-        for gaia_user_models in gaia_users_models:
-            self.smtp_connector.send_contextual_template_notification(
-                gaia_user_models,
-                self.contextual_notification_template,
-                self,
-            )
-            if not sent:
-                sent = True
+        if not gaia_users_models:
+            return
 
-        if sent:
-            self.set_last_sent_at()
+        if messages is None:
+            messages = self.render_messages(gaia_users_models)
 
-    def set_last_sent_at(self):
+        self.smtp_connector.send_contextual_template_notifications(
+            gaia_users_models,
+            self.contextual_notification_template,
+            self,
+            messages,
+        )
+        self.set_last_sent_at(update_fields)
+
+    def set_last_sent_at(self, update_fields=None):
         """
         Sets last_sent_at to current instant
+
+        The field is added to update_fields when given instead of saved
         """
 
         self.last_sent_at = utils.get_local_now()
-        self.save(update_fields=["last_sent_at"])
+        if update_fields is None:
+            NotificationSchedule.objects.filter(pk=self.pk).update(
+                last_sent_at=self.last_sent_at
+            )
+        else:
+            update_fields.add("last_sent_at")
 
 
 class NotificationTemplate(models.Model):
@@ -916,14 +1654,24 @@ class NotificationTemplate(models.Model):
     name = models.CharField(max_length=256, unique=True)
     path = models.TextField()
 
+    @cached_property
+    def compiled_template(self):
+        """
+        Parsed template at path, kept on the instance between renders
+        """
+
+        return compiled_template(self.path)
+
+    def save(self, *args, **kwargs):
+        self.__dict__.pop("compiled_template", None)
+        super().save(*args, **kwargs)
+
     def render(self, context=None):
         """
         Constructs the template
         """
 
-        context = context if context else {}
-
-        return render_to_string(self.path, context)
+        return self.compiled_template.render(context if context else {})
 
     def __str__(self):
         return f"{self.name} notification template"
@@ -940,9 +1688,65 @@ class ContextualNotificationTemplate(models.Model):
         on_delete=models.SET_NULL,
         null=True,
     )
+    context_models = {
+        "GaiaUser": "gaia_user",
+        "SubjectGroup": "subject_group",
+        "Job": "job",
+        "Session": "session",
+        "Employee": "employee",
+        "Client": "client",
+        "Subject": "subject",
+    }
     html = models.BooleanField(null=True, blank=True)
     context = JSONField()
 
+    @cached_property
+    def static_context(self):
+        """
+        Literal context values, which are the same for every render
+        """
+
+        return {
+            key: context_value
+            for key, context_value in self.context.items()
+            if "@" not in context_value
+        }
+
+    @cached_property
+    def dynamic_context_spec(self):
+        """
+        @Model.field context values parsed once into
+        (key, gaia_user_models key, field) entries
+        """
+
+        dynamic_context_spec = []
+        for key, context_value in self.context.items():
+            if "@" not in context_value:
+                continue
+
+            model_name, _, field = context_value.partition(".")
+            field = field.partition(".")[0]
+            gaia_user_models_key = self.context_models.get(
+                model_name.rpartition("@")[2]
+            )
+            if gaia_user_models_key and field:
+                dynamic_context_spec.append((key, gaia_user_models_key, field))
+
+        return dynamic_context_spec
+
+    @property
+    def recipient_specific(self):
+        """
+        Whether the context references models of the notified GaiaUser
+        """
+
+        return bool(self.dynamic_context_spec)
+
+    def save(self, *args, **kwargs):
+        self.__dict__.pop("static_context", None)
+        self.__dict__.pop("dynamic_context_spec", None)
+        super().save(*args, **kwargs)
+
     def render(self, gaia_user_models=None):
         """
         Constructs the template
@@ -955,54 +1759,48 @@ class ContextualNotificationTemplate(models.Model):
         Gets context including database field values
         """
 
-        def get_model_field(context_value, model):
-            """
-            Helper to get a model field
-            """
-
-            field = context_value.split(".")[1]
-            return getattr(model, field) if model else None
-
-        context = {}
         if not gaia_user_models:
             gaia_user_models = {}
 
-        gaia_user = gaia_user_models.get("gaia_user")
-        subject_group = gaia_user_models.get("subject_group")
-        job = gaia_user_models.get("job")
-        session = gaia_user_models.get("session")
-        employee = gaia_user_models.get("employee")
-        client = gaia_user_models.get("client")
-        subject = gaia_user_models.get("subject")
-        for key, context_value in self.context.items():
-            if "@" not in context_value:
-                context[key] = context_value
-            elif "GaiaUser" in context_value:
-                context[key] = get_model_field(context_value, gaia_user)
-            elif "SubjectGroup" in context_value:
-                context[key] = get_model_field(context_value, subject_group)
-            elif "Job" in context_value:
-                context[key] = get_model_field(context_value, job)
-            elif "Session" in context_value:
-                context[key] = get_model_field(context_value, session)
-            elif "Employee" in context_value:
-                context[key] = get_model_field(context_value, employee)
-            elif "Client" in context_value:
-                context[key] = get_model_field(context_value, client)
-            elif "Subject" in context_value:
-                context[key] = get_model_field(context_value, subject)
-
-        return context
+        context = {}
+        for key, gaia_user_models_key, field in self.dynamic_context_spec:
+            model = gaia_user_models.get(gaia_user_models_key)
+            context[key] = getattr(model, field) if model else None
+
+        return {**self.static_context, **context}
 
     def __str__(self):
         return f"Contextual {self.notification_template}"
 
 
+class NotificationManager(models.Manager):
+    """
+    Notification manager joining the related rows read by Notification
+    listings
+    """
+
+    def get_queryset(self):
+        return (
+            super()
+            .get_queryset()
+            .select_related(
+                "gaia_user",
+                "contextual_notification_template__notification_template",
+                "notification_schedule",
+            )
+        )
+
+
 class Notification(models.Model):
     """
     Notification model
     """
 
+    EMAIL = "email"
+    SMS = "sms"
+    SLACK = "slack"
+    CHANNEL_CHOICES = [(EMAIL, "Email"), (SMS, "SMS"), (SLACK, "Slack")]
+
     contextual_notification_template = models.ForeignKey(
         ContextualNotificationTemplate,
         related_name="notifications",
@@ -1042,15 +1840,47 @@ class Notification(models.Model):
         null=True,
         blank=True,
     )
+    channel = models.CharField(
+        max_length=8,
+        choices=CHANNEL_CHOICES,
+        blank=True,
+        editable=False,
+        db_index=True,
+    )
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    objects = NotificationManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["contextual_notification_template", "notification_schedule"]
+            ),
+            models.Index(fields=["gaia_user", "created"]),
+        ]
+
     def __str__(self):
-        if self.smtp_connector:
-            notification_type = "Email"
-        elif self.twilio_connector:
-            notification_type = "SMS"
-        elif self.slack_connector:
-            notification_type = "Slack"
+        return f"{self.get_channel_display()} notification to {self.gaia_user}"
+
+    def save(self, *args, **kwargs):
+        if not self.channel:
+            self.channel = self.connector_channel()
+        super().save(*args, **kwargs)
+
+    def connector_channel(self):
+        """
+        Channel of the connector the notification was sent through
+
+        bulk_create skips save(), so bulk created notifications are given
+        their channel when constructed
+        """
+
+        if self.smtp_connector_id:
+            return self.EMAIL
+        elif self.twilio_connector_id:
+            return self.SMS
+        elif self.slack_connector_id:
+            return self.SLACK
 
-        return f"{notification_type} notification to {self.gaia_user}"
+        return ""